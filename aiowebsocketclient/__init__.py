@@ -1,3 +1,4 @@
-from aiowebsocketclient.connector import WebSocketConnector
+from aiowebsocketclient.connector import (
+    WebSocketConnector, LIFO, FIFO, ROUND_ROBIN)
 
 __version__ = "0.0.3"
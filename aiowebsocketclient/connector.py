@@ -2,8 +2,8 @@ import asyncio
 import io
 import sys
 import traceback
-from collections import defaultdict
-from itertools import chain
+from collections import defaultdict, deque, OrderedDict
+from itertools import chain, count
 from urllib.parse import urlparse
 
 
@@ -11,6 +11,13 @@ import aiohttp
 from aiohttp import websocket_client
 
 
+LIFO = 'lifo'
+FIFO = 'fifo'
+ROUND_ROBIN = 'round_robin'
+
+REUSE_POLICIES = (LIFO, FIFO, ROUND_ROBIN)
+
+
 class ClientWebSocketResponse(websocket_client.ClientWebSocketResponse):
 
     def __init__(self, reader, writer, protocol,
@@ -19,6 +26,10 @@ class ClientWebSocketResponse(websocket_client.ClientWebSocketResponse):
                          autoclose, autoping, loop)
         self._key = (None, None, None)
         self._ws_connector = None
+        self._reused = False
+        self._affinity = None
+        self._affinity_hit = False
+        self._last_checkout = 0
 
     def __repr__(self):
         out = io.StringIO()
@@ -26,6 +37,13 @@ class ClientWebSocketResponse(websocket_client.ClientWebSocketResponse):
               self._key[0], self._key[1], self._key[2]), file=out)
         return out.getvalue()
 
+    @property
+    def affinity_hit(self):
+        """True if this is the websocket bound to the affinity key passed
+        to ``ws_connect``, i.e. its server-side state can be reused.
+        """
+        return self._affinity_hit
+
     @asyncio.coroutine
     def release(self):
         if self._ws_connector is not None:
@@ -50,7 +68,8 @@ class WebSocketConnector:
 
     def __init__(self, *, conn_timeout=None, force_close=False, limit=1024,
                  client_session=None, loop=None,
-                 ws_response_class=ClientWebSocketResponse):
+                 ws_response_class=ClientWebSocketResponse,
+                 reuse_policy=LIFO):
         """Manages socket pooling for multiple websocket connections.
 
         Based on aiohttp.ClientSession and aiohttp.BaseConnector.
@@ -79,14 +98,30 @@ class WebSocketConnector:
         :param ws_response_class: WebSocketResponse class implementation.
                                   ``ClientWebSocketResponse`` by default
 
+        :param str reuse_policy: order in which idle websockets are reused.
+                                 ``LIFO`` (default) reuses the most recently
+                                 released websocket, ``FIFO`` the least
+                                 recently released one and ``ROUND_ROBIN``
+                                 the least recently checked out one, so
+                                 that websockets are handed out in turn
+                                 regardless of how long they are held
+
         """
+        if reuse_policy not in REUSE_POLICIES:
+            raise ValueError(
+                "reuse_policy must be one of {}, got {!r}".format(
+                    REUSE_POLICIES, reuse_policy))
         if loop is None:
             loop = asyncio.get_event_loop()
         self._closed = False
         if loop.get_debug():
             self._source_traceback = traceback.extract_stack(sys._getframe(1))
         self._conns = {}
+        self._bound_conns = {}
         self._acquired = defaultdict(list)
+        self._reuse_policy = reuse_policy
+        self._checkouts = count()
+        self._affinity = {}
         self._conn_timeout = conn_timeout
         self._force_close = force_close
         self._waiters = defaultdict(list)
@@ -115,6 +150,11 @@ class WebSocketConnector:
         """
         return self._limit
 
+    @property
+    def reuse_policy(self):
+        """The order in which idle websockets are reused."""
+        return self._reuse_policy
+
     @asyncio.coroutine
     def close(self):
         """Close all opened websockets and underlying client session."""
@@ -125,7 +165,8 @@ class WebSocketConnector:
             if hasattr(self._loop, 'is_closed'):
                 if self._loop.is_closed():
                     return
-            for key, data in self._conns.items():
+            for key, data in chain(self._conns.items(),
+                                   self._bound_conns.items()):
                 for websocket in data:
                     yield from websocket._close()
             for websocket in chain(*self._acquired.values()):
@@ -135,7 +176,9 @@ class WebSocketConnector:
                 self._client_session.close()
                 self._client_session = None
             self._conns.clear()
+            self._bound_conns.clear()
             self._acquired.clear()
+            self._affinity.clear()
 
     @property
     def closed(self):
@@ -153,34 +196,240 @@ class WebSocketConnector:
                    protocols=(),
                    timeout=10.0,
                    autoclose=True,
-                   autoping=True):
+                   autoping=True,
+                   affinity=None):
+        """Get a pooled websocket for ``url``, creating one if necessary.
+        Websockets are only reused for the same url and protocols.
+
+        :param affinity: hashable key (optional). The first websocket
+                         checked out with a key is bound to it and is
+                         returned for that key whenever it is idle, which
+                         ``ClientWebSocketResponse.affinity_hit`` reports.
+                         While it is busy, an unbound websocket is used
+                         without moving the binding. Other checkouts only
+                         take over a bound websocket, dropping its binding,
+                         when no unbound websocket is idle
+        """
+        return (yield from self._ws_connect(
+            url, protocols=protocols, timeout=timeout, autoclose=autoclose,
+            autoping=autoping, affinity=affinity))
+
+    @asyncio.coroutine
+    def _ws_connect(self, url, *,
+                    protocols=(),
+                    timeout=10.0,
+                    autoclose=True,
+                    autoping=True,
+                    affinity=None,
+                    fresh=False):
         parsed = urlparse(url)
         host = parsed.hostname
         port = parsed.port
         scheme = parsed.scheme
         ssl = scheme in ["https", "wss"]
-        key = (host, port, ssl)
+        resource = parsed.path or '/'
+        if parsed.query:
+            resource += '?' + parsed.query
+        key = (host, port, ssl, resource, tuple(protocols))
 
         yield from self._semaphore.acquire()
 
-        websocket = self._get(key)
+        if affinity is not None:
+            bound = self._affinity.get((key, affinity))
+            if bound is not None and bound.closed:
+                self._unbind(bound)
+                bound_conns = self._bound_conns.get(key)
+                if bound_conns is not None:
+                    bound_conns.pop(bound, None)
+
+        websocket = None
+        if not fresh:
+            websocket = self._get(key, affinity)
         if websocket is None:
-            websocket = yield from self._create_connection(
-                url, protocols, timeout, autoclose, autoping, key)
-
+            try:
+                websocket = yield from self._create_connection(
+                    url, protocols, timeout, autoclose, autoping, key)
+            except BaseException:
+                self._semaphore.release()
+                raise
+            websocket._reused = False
+        else:
+            websocket._reused = True
+
+        hit = affinity is not None and websocket._affinity == affinity
+        if (affinity is not None and not hit and
+                (key, affinity) not in self._affinity):
+            websocket._affinity = affinity
+            self._affinity[(key, affinity)] = websocket
+        websocket._affinity_hit = hit
+        websocket._last_checkout = next(self._checkouts)
         self._acquired[key].append(websocket)
         return websocket
 
-    def _get(self, key):
+    @asyncio.coroutine
+    def request(self, url, payload, *,
+                timeout=None,
+                retry=False,
+                protocols=(),
+                autoclose=True,
+                affinity=None):
+        """Send a single message and wait for the reply using a pooled
+        websocket.
+
+        The websocket is released back to the pool once a text or binary
+        reply is received. It is closed instead if an error occurs, the
+        request times out or the server closes the connection.
+
+        :param str url: websocket endpoint
+
+        :param payload: message to send. ``str`` is sent as a text message,
+                        anything else as a binary message
+
+        :param float timeout: timeout for the whole request (optional),
+                              including waiting for a free connection,
+                              connecting and receiving the reply. ``None``
+                              means no timeout (in seconds)
+
+        :param bool retry: if the server closes a pooled websocket instead
+                           of replying, send the payload again once over a
+                           fresh connection. The server may then receive
+                           the payload twice, so only enable this for
+                           idempotent requests. ``False`` by default
+
+        :param affinity: affinity key passed to ``ws_connect`` (optional)
+
+        :returns: the reply message as returned by
+                  ``ClientWebSocketResponse.receive``
+
+        :raises aiohttp.errors.ServerDisconnectedError: if the server closes
+                                                        the connection
+                                                        before replying
+        """
+        if timeout is not None:
+            deadline = self._loop.time() + timeout
+
+        def remaining():
+            if timeout is None:
+                return None
+            return max(deadline - self._loop.time(), 0)
+
+        websocket = yield from asyncio.wait_for(
+            self._ws_connect(url, protocols=protocols, autoclose=autoclose,
+                             affinity=affinity),
+            remaining(), loop=self._loop)
+        msg = yield from self._exchange(websocket, payload, remaining())
+        if (retry and websocket._reused and
+                msg.tp in (aiohttp.MsgType.close, aiohttp.MsgType.closed)):
+            websocket = yield from asyncio.wait_for(
+                self._ws_connect(url, protocols=protocols,
+                                 autoclose=autoclose, affinity=affinity,
+                                 fresh=True),
+                remaining(), loop=self._loop)
+            msg = yield from self._exchange(websocket, payload, remaining())
+        if msg.tp == aiohttp.MsgType.error:
+            raise msg.data
+        if not self._is_reply(msg):
+            raise aiohttp.errors.ServerDisconnectedError(
+                'websocket closed before reply')
+        return msg
+
+    @staticmethod
+    def _is_reply(msg):
+        return msg.tp in (aiohttp.MsgType.text, aiohttp.MsgType.binary)
+
+    @asyncio.coroutine
+    def _exchange(self, websocket, payload, timeout):
+        try:
+            if isinstance(payload, str):
+                websocket.send_str(payload)
+            else:
+                websocket.send_bytes(payload)
+            msg = yield from asyncio.wait_for(
+                websocket.receive(), timeout, loop=self._loop)
+        except BaseException:
+            yield from websocket.close()
+            raise
+        if self._is_reply(msg):
+            yield from websocket.release()
+        else:
+            yield from websocket.close()
+        return msg
+
+    @asyncio.coroutine
+    def gather_requests(self, url, payloads, *,
+                        concurrency=None,
+                        timeout=None,
+                        retry=False,
+                        return_exceptions=False,
+                        protocols=(),
+                        autoclose=True):
+        """Send many messages to the same endpoint, each one over a pooled
+        websocket, and wait for all the replies.
+
+        :param str url: websocket endpoint
+
+        :param payloads: iterable of messages to send, see ``request``
+
+        :param int concurrency: maximum number of requests in flight at
+                                once (optional). Defaults to ``limit``
+
+        :param float timeout: timeout for each request (optional), see
+                              ``request``
+
+        :param bool retry: see ``request``
+
+        :param bool return_exceptions: passed through to ``asyncio.gather``
+
+        :returns: list of reply messages in the order of ``payloads``
+        """
+        if concurrency is None:
+            concurrency = self._limit
+        if concurrency < 1:
+            raise ValueError(
+                "concurrency must be at least 1, got {!r}".format(
+                    concurrency))
+        semaphore = asyncio.Semaphore(value=concurrency, loop=self._loop)
+
+        @asyncio.coroutine
+        def bounded_request(payload):
+            with (yield from semaphore):
+                return (yield from self.request(
+                    url, payload, timeout=timeout, retry=retry,
+                    protocols=protocols, autoclose=autoclose))
+
+        return (yield from asyncio.gather(
+            *[bounded_request(payload) for payload in payloads],
+            loop=self._loop, return_exceptions=return_exceptions))
+
+    def _get(self, key, affinity=None):
+        bound_conns = self._bound_conns.get(key)
+        if affinity is not None and bound_conns:
+            websocket = self._affinity.get((key, affinity))
+            if websocket in bound_conns:
+                del bound_conns[websocket]
+                return websocket
         conns = self._conns.get(key)
         while conns:
-            websocket = conns.pop()
-            if websocket.closed:
-                websocket = None
+            if self._reuse_policy == LIFO:
+                websocket = conns.pop()
             else:
+                websocket = conns.popleft()
+            if not websocket.closed:
+                return websocket
+        # No unbound websocket is idle, take over a bound one.
+        while bound_conns:
+            websocket, _ = bound_conns.popitem(
+                last=self._reuse_policy == LIFO)
+            self._unbind(websocket)
+            if not websocket.closed:
                 return websocket
         return None
 
+    def _unbind(self, websocket):
+        if websocket._affinity is not None:
+            self._affinity.pop((websocket._key, websocket._affinity), None)
+            websocket._affinity = None
+
     @asyncio.coroutine
     def _release(self, key, websocket, *, should_close=False):
         if self._closed:
@@ -197,12 +446,35 @@ class WebSocketConnector:
             should_close = True
 
         if should_close:
+            self._unbind(websocket)
             yield from websocket._close()
+        elif websocket._affinity is not None:
+            bound_conns = self._bound_conns.get(key)
+            if bound_conns is None:
+                bound_conns = self._bound_conns[key] = OrderedDict()
+            bound_conns[websocket] = None
         else:
             conns = self._conns.get(key)
             if conns is None:
-                conns = self._conns[key] = []
-            conns.append(websocket)
+                conns = self._conns[key] = deque()
+            if self._reuse_policy == ROUND_ROBIN:
+                self._insert_by_checkout(conns, websocket)
+            else:
+                conns.append(websocket)
+
+    @staticmethod
+    def _insert_by_checkout(conns, websocket):
+        # Keep idle websockets ordered by last checkout so that popleft
+        # returns the least recently checked out one. The released
+        # websocket usually belongs at or near the end. deque.insert is
+        # not available on Python 3.4, hence the rotations.
+        index = len(conns)
+        while (index and
+               conns[index - 1]._last_checkout > websocket._last_checkout):
+            index -= 1
+        conns.rotate(len(conns) - index)
+        conns.append(websocket)
+        conns.rotate(index - len(conns) + 1)
 
     @asyncio.coroutine
     def _create_connection(self, url, protocols, timeout, autoclose, autoping,
@@ -6,7 +6,8 @@ from urllib.parse import urlparse
 import aiohttp
 from aiohttp import web
 
-from aiowebsocketclient import WebSocketConnector
+from aiowebsocketclient import (
+    WebSocketConnector, FIFO, ROUND_ROBIN)
 
 
 class TestWebSocketClientFunctional(unittest.TestCase):
@@ -67,13 +68,13 @@ class TestWebSocketClientFunctional(unittest.TestCase):
 
         return ws
 
-    def get_key(self, url):
+    def get_key(self, url, protocols=()):
         parsed = urlparse(url)
         host = parsed.hostname
         port = parsed.port
         scheme = parsed.scheme
         ssl = scheme in ["https", "wss"]
-        key = (host, port, ssl)
+        key = (host, port, ssl, parsed.path or '/', tuple(protocols))
         return key
 
     def test_conn_close(self):
@@ -382,6 +383,400 @@ class TestWebSocketClientFunctional(unittest.TestCase):
 
         self.loop.run_until_complete(go())
 
+    def test_request(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+
+            msg = yield from ws_session.request(url, 'ask')
+            self.assertEqual(msg.data, 'ask/answer')
+            self.assertFalse(ws_session._acquired[key])
+            self.assertEqual(len(ws_session._conns[key]), 1)
+            resp = ws_session._conns[key][0]
+
+            msg = yield from ws_session.request(url, 'ask-again')
+            self.assertEqual(msg.data, 'ask-again/answer')
+            self.assertEqual(list(ws_session._conns[key]), [resp])
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_stale_conn_retry(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.simple_wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+
+            msg = yield from ws_session.request(url, 'ask')
+            self.assertEqual(msg.data, 'ask/answer')
+            self.assertFalse(ws_session._acquired[key])
+            stale = ws_session._conns[key][0]
+
+            msg = yield from ws_session.request(url, 'ask-again', retry=True)
+            self.assertEqual(msg.data, 'ask-again/answer')
+            self.assertTrue(stale.closed)
+            self.assertFalse(ws_session._acquired[key])
+            self.assertEqual(len(ws_session._conns[key]), 1)
+            self.assertNotEqual(ws_session._conns[key][0], stale)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_stale_conn_no_retry(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.simple_wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+
+            msg = yield from ws_session.request(url, 'ask')
+            self.assertEqual(msg.data, 'ask/answer')
+
+            with self.assertRaises(aiohttp.errors.ServerDisconnectedError):
+                yield from ws_session.request(url, 'ask-again')
+            self.assertFalse(ws_session._acquired[key])
+            self.assertFalse(ws_session._conns[key])
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_resource(self):
+
+        @asyncio.coroutine
+        def handler(request):
+            ws = web.WebSocketResponse()
+            ws.start(request)
+            while True:
+                msg = yield from ws.receive()
+                if msg.tp == aiohttp.MsgType.text:
+                    ws.send_str(msg.data + request.path)
+                else:
+                    break
+            return ws
+
+        @asyncio.coroutine
+        def go():
+            app, _, url = yield from self.create_server('GET', '/a', handler)
+            app.router.add_route('GET', '/b', handler)
+            url2 = url[:-len('/a')] + '/b'
+
+            ws_session = WebSocketConnector(loop=self.loop)
+            msg = yield from ws_session.request(url, 'ask')
+            self.assertEqual(msg.data, 'ask/a')
+            msg = yield from ws_session.request(url2, 'ask')
+            self.assertEqual(msg.data, 'ask/b')
+            msg = yield from ws_session.request(url, 'ask')
+            self.assertEqual(msg.data, 'ask/a')
+
+            self.assertEqual(len(ws_session._conns[self.get_key(url)]), 1)
+            self.assertEqual(len(ws_session._conns[self.get_key(url2)]), 1)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_server_close(self):
+
+        @asyncio.coroutine
+        def handler(request):
+            ws = web.WebSocketResponse()
+            ws.start(request)
+            yield from ws.receive()
+            yield from ws.close()
+            return ws
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/', handler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+
+            with self.assertRaises(aiohttp.errors.ServerDisconnectedError):
+                yield from ws_session.request(url, 'ask')
+            self.assertFalse(ws_session._acquired[key])
+            self.assertIsNone(ws_session._conns.get(key))
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_conn_error(self):
+
+        @asyncio.coroutine
+        def handler(request):
+            return web.Response(text='not a websocket')
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/', handler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop, limit=1)
+
+            for i in range(3):
+                with self.assertRaises(aiohttp.errors.WSServerHandshakeError):
+                    yield from asyncio.wait_for(
+                        ws_session.request(url, 'ask'), 1, loop=self.loop)
+            self.assertFalse(ws_session._acquired[key])
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_timeout(self):
+
+        @asyncio.coroutine
+        def handler(request):
+            ws = web.WebSocketResponse()
+            ws.start(request)
+            yield from ws.receive()
+            yield from asyncio.sleep(0.5, loop=self.loop)
+            yield from ws.close()
+            return ws
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/', handler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+
+            with self.assertRaises(asyncio.TimeoutError):
+                yield from ws_session.request(url, 'ask', timeout=0.01)
+            self.assertFalse(ws_session._acquired[key])
+            self.assertIsNone(ws_session._conns.get(key))
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_request_timeout_waiting_for_conn(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop, limit=1)
+            resp = yield from ws_session.ws_connect(url)
+
+            with self.assertRaises(asyncio.TimeoutError):
+                yield from ws_session.request(url, 'ask', timeout=0.1)
+
+            yield from resp.release()
+            msg = yield from ws_session.request(url, 'ask', timeout=1)
+            self.assertEqual(msg.data, 'ask/answer')
+            self.assertFalse(ws_session._acquired[key])
+            self.assertEqual(ws_session._conns[key][0], resp)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_gather_requests(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+
+            payloads = ['ask{}'.format(i) for i in range(5)]
+            msgs = yield from ws_session.gather_requests(
+                url, payloads, concurrency=2)
+            self.assertEqual([msg.data for msg in msgs],
+                             [p + '/answer' for p in payloads])
+            self.assertFalse(ws_session._acquired[key])
+            self.assertEqual(len(ws_session._conns[key]), 2)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_gather_requests_invalid_concurrency(self):
+        self.handler = None
+
+        @asyncio.coroutine
+        def go():
+            ws_session = WebSocketConnector(loop=self.loop)
+            for concurrency in (0, -1):
+                with self.assertRaises(ValueError):
+                    yield from ws_session.gather_requests(
+                        'http://127.0.0.1/', ['ask'], concurrency=concurrency)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_fifo_reuse_policy(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            ws_session = WebSocketConnector(loop=self.loop,
+                                            reuse_policy=FIFO)
+            resp = yield from ws_session.ws_connect(url)
+            resp2 = yield from ws_session.ws_connect(url)
+            yield from resp.release()
+            yield from resp2.release()
+
+            resp3 = yield from ws_session.ws_connect(url)
+            self.assertEqual(resp3, resp)
+            yield from resp3.release()
+
+            resp4 = yield from ws_session.ws_connect(url)
+            self.assertEqual(resp4, resp2)
+            yield from resp4.release()
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_round_robin_reuse_policy(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            ws_session = WebSocketConnector(loop=self.loop,
+                                            reuse_policy=ROUND_ROBIN)
+            resps = []
+            for i in range(3):
+                resp = yield from ws_session.ws_connect(url)
+                resps.append(resp)
+            # Released out of checkout order, FIFO would start with resps[2].
+            for i in (2, 0, 1):
+                yield from resps[i].release()
+
+            checkouts = []
+            for i in range(6):
+                resp = yield from ws_session.ws_connect(url)
+                checkouts.append(resp)
+                yield from resp.release()
+            self.assertEqual(checkouts, resps + resps)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_invalid_reuse_policy(self):
+        self.handler = None
+        with self.assertRaises(ValueError):
+            WebSocketConnector(loop=self.loop, reuse_policy='random')
+
+    def test_affinity(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+            resp = yield from ws_session.ws_connect(url, affinity='tenant-a')
+            self.assertFalse(resp.affinity_hit)
+            resp2 = yield from ws_session.ws_connect(url)
+            yield from resp2.release()
+            yield from resp.release()
+
+            # Unbound websockets are preferred over the bound one.
+            resp3 = yield from ws_session.ws_connect(url)
+            self.assertEqual(resp3, resp2)
+
+            resp4 = yield from ws_session.ws_connect(url, affinity='tenant-a')
+            self.assertEqual(resp4, resp)
+            self.assertTrue(resp4.affinity_hit)
+
+            # The bound websocket is busy, the binding does not move.
+            resp5 = yield from ws_session.ws_connect(url, affinity='tenant-a')
+            self.assertNotIn(resp5, (resp, resp2))
+            self.assertFalse(resp5.affinity_hit)
+            yield from resp5.release()
+
+            resp6 = yield from ws_session.ws_connect(url, affinity='tenant-b')
+            self.assertEqual(resp6, resp5)
+            self.assertFalse(resp6.affinity_hit)
+
+            yield from resp3.release()
+            yield from resp4.release()
+            yield from resp6.release()
+
+            resp7 = yield from ws_session.ws_connect(url, affinity='tenant-a')
+            self.assertEqual(resp7, resp)
+            self.assertTrue(resp7.affinity_hit)
+            resp8 = yield from ws_session.ws_connect(url, affinity='tenant-b')
+            self.assertEqual(resp8, resp5)
+            self.assertTrue(resp8.affinity_hit)
+            resp9 = yield from ws_session.ws_connect(url)
+            self.assertEqual(resp9, resp2)
+            yield from resp8.release()
+            yield from resp9.release()
+
+            # A closed bound websocket is replaced and the key rebound.
+            yield from resp7.close()
+            resp10 = yield from ws_session.ws_connect(url, affinity='tenant-a')
+            self.assertEqual(resp10, resp2)
+            self.assertFalse(resp10.affinity_hit)
+            yield from resp10.release()
+            resp11 = yield from ws_session.ws_connect(url, affinity='tenant-a')
+            self.assertEqual(resp11, resp10)
+            self.assertTrue(resp11.affinity_hit)
+            yield from resp11.release()
+
+            self.assertFalse(ws_session._conns[key])
+            self.assertEqual(len(ws_session._bound_conns[key]), 2)
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
+    def test_affinity_many_keys(self):
+
+        @asyncio.coroutine
+        def go():
+            _, _, url = yield from self.create_server('GET', '/',
+                                                      self.wshandler)
+
+            key = self.get_key(url)
+            ws_session = WebSocketConnector(loop=self.loop)
+            resps = set()
+            for i in range(10):
+                resp = yield from ws_session.ws_connect(url, affinity=i)
+                self.assertFalse(resp.affinity_hit)
+                resps.add(resp)
+                yield from resp.release()
+
+            # Idle bound websockets are taken over rather than piling up.
+            self.assertEqual(len(resps), 1)
+            self.assertEqual(len(ws_session._affinity), 1)
+            self.assertEqual(len(ws_session._bound_conns[key]), 1)
+
+            resp = yield from ws_session.ws_connect(url, affinity=9)
+            self.assertTrue(resp.affinity_hit)
+            yield from resp.release()
+
+            resp = yield from ws_session.ws_connect(url)
+            self.assertIn(resp, resps)
+            self.assertFalse(ws_session._affinity)
+            yield from resp.release()
+
+            resp = yield from ws_session.ws_connect(url, affinity=9)
+            self.assertIn(resp, resps)
+            self.assertFalse(resp.affinity_hit)
+            yield from resp.release()
+            yield from ws_session.close()
+
+        self.loop.run_until_complete(go())
+
 
 class TestClientSessionMngmnt(unittest.TestCase):
 